@@ -7,26 +7,90 @@ Generates detailed analysis for each stock including:
 """
 
 import pandas as pd
-import json
+import numpy as np
+import heapq
+from bisect import bisect_left, bisect_right
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
 from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import os
 import shutil
+import sys
 
 # Configuration
 EXCEL_FILE = 'Stock_Tracker_Fixed.xlsx'
 CONFIG_FILE = 'stocks_config.json'
 OUTPUT_FILE = 'dashboard_data.json'
 STOCK_DETAILS_DIR = 'stock_details'
+HISTORY_DIR = 'dashboard_history'
+EMA_PERIODS = (9, 20, 200)
+CACHE_VERSION = b'2'  # Bump whenever read_stock_data changes the cached columns or dtypes
+FLOAT32_PRICE_LIMIT = 2 ** 17  # Below this, float32 still round-trips every 2-decimal price
 
 
-def calculate_ema(prices, period):
-    """Calculate Exponential Moving Average"""
-    if len(prices) < period:
-        return None
+@lru_cache(maxsize=32)
+def ema_weights(periods, length):
+    """EMA weights for a series of the given length, one row per period (shared by all stocks)"""
+    # Last value of ewm(span=period, adjust=False) as a dot product: each price
+    # weighted alpha * (1 - alpha)^age, the seed price has no alpha
+    alphas = 2.0 / (np.array(periods) + 1)
+    weights = (1 - alphas[:, None]) ** np.arange(length - 1, -1, -1)
+    weights[:, 1:] *= alphas[:, None]
+    weights.flags.writeable = False
+    return weights
+
+
+def calculate_emas(prices, periods=EMA_PERIODS):
+    """Calculate Exponential Moving Averages for several periods in one pass"""
+    prices = np.asarray(prices, dtype='float64')
+    emas = ema_weights(tuple(periods), len(prices)) @ prices
     
-    prices_series = pd.Series(prices)
-    ema = prices_series.ewm(span=period, adjust=False).mean()
-    return round(float(ema.iloc[-1]), 2)
+    return [round(float(ema), 2) if len(prices) >= period else None
+            for ema, period in zip(emas, periods)]
+
+
+def calculate_emas_for_all(daily_closes, periods=EMA_PERIODS):
+    """Calculate EMAs for every stock of a (date x stock) close matrix at once"""
+    closes = daily_closes.to_numpy('float64').round(2)
+    valid = ~np.isnan(closes)
+    counts = valid.sum(axis=0)
+    cols = np.arange(closes.shape[1])
+    
+    # Move each stock's closes to the bottom (in order) so the latest close is
+    # always in the last row and missing dates are zero-weighted at the top
+    order = np.argsort(valid, axis=0, kind='stable')
+    packed = np.where(np.take_along_axis(valid, order, axis=0),
+                      np.take_along_axis(closes, order, axis=0), 0.0)
+    seeds = packed[np.minimum(len(packed) - counts, len(packed) - 1), cols]
+    ages = np.arange(len(packed) - 1, -1, -1)
+    
+    emas = []
+    for period in periods:
+        # Same weights as calculate_emas(), the seed close gets (1 - alpha)^age without alpha
+        alpha = 2.0 / (period + 1)
+        ema = (alpha * (1 - alpha) ** ages) @ packed + (1 - alpha) ** counts * seeds
+        emas.append([round(float(value), 2) if count >= period else None
+                     for value, count in zip(ema, counts)])
+    
+    return {stock: list(stock_emas) for stock, stock_emas in zip(daily_closes.columns, zip(*emas))}
+
+
+def reduce_panel(prices):
+    """Open, close, high, low and high/low row positions for every column of a price array"""
+    valid = ~np.isnan(prices)
+    cols = np.arange(prices.shape[1])
+    
+    open_idx = valid.argmax(axis=0)
+    close_idx = prices.shape[0] - 1 - valid[::-1].argmax(axis=0)
+    high_idx = np.nanargmax(prices, axis=0)
+    low_idx = np.nanargmin(prices, axis=0)
+    
+    return (prices[open_idx, cols], prices[close_idx, cols],
+            prices[high_idx, cols], prices[low_idx, cols],
+            high_idx, low_idx)
 
 
 def analyze_trend(current_price, ema_9, ema_20, ema_200):
@@ -73,57 +137,51 @@ def analyze_trend(current_price, ema_9, ema_20, ema_200):
     }
 
 
-def get_historical_close_prices(df, stock_name):
+def build_daily_ohlc(df, stock_names):
+    """Daily open, close, high and low of every stock (one row per date, sorted)"""
+    grouped = df.groupby('Date', sort=True, observed=True)[stock_names]
+    return {
+        'open': grouped.first(),
+        'close': grouped.last(),
+        'high': grouped.max(),
+        'low': grouped.min()
+    }
+
+
+def get_historical_close_prices(closes, has_price):
     """Get daily closing prices"""
-    daily_closes = []
-    dates = sorted(df['Date'].unique())
-    
-    for date in dates:
-        date_data = df[df['Date'] == date][stock_name].dropna()
-        if len(date_data) > 0:
-            close_price = date_data.iloc[-1]
-            daily_closes.append(float(close_price))
-    
-    return daily_closes
+    return closes[has_price].astype('float64').round(2).tolist()
 
 
-def get_intraday_data(df, stock_name, date):
+def get_intraday_data(day_data, stock_name):
     """Get intraday data"""
-    date_data = df[df['Date'] == date][['Time', stock_name]].dropna()
-    
-    intraday = []
-    for _, row in date_data.iterrows():
-        time_str = str(row['Time'])
-        price = float(row[stock_name])
-        intraday.append({'time': time_str, 'price': price})
+    prices = day_data[stock_name].to_numpy()
+    has_price = ~np.isnan(prices)
     
-    return intraday
+    times = day_data['Time'].to_numpy()[has_price]
+    prices = prices[has_price].astype('float64').round(2)
+    return [{'time': time_str, 'price': price} for time_str, price in zip(times, prices.tolist())]
 
 
-def generate_stock_detail_file(df, stock_name, stock_info, latest_date):
+def generate_stock_detail_file(latest_data, sorted_dates, closes, highs, lows, emas, stock_name, stock_info, latest_date, updated_time):
     """Generate detailed JSON for individual stock"""
     
-    daily_closes = get_historical_close_prices(df, stock_name)
+    # Close, high and low are all NaN on the same dates, so one mask serves all three
+    has_price = ~np.isnan(closes)
+    daily_closes = get_historical_close_prices(closes, has_price)
     
-    ema_9 = calculate_ema(daily_closes, 9) if len(daily_closes) >= 9 else None
-    ema_20 = calculate_ema(daily_closes, 20) if len(daily_closes) >= 20 else None
-    ema_200 = calculate_ema(daily_closes, 200) if len(daily_closes) >= 200 else None
+    ema_9, ema_20, ema_200 = emas
     
     trend = analyze_trend(stock_info['close'], ema_9, ema_20, ema_200)
     
     last_10_days = daily_closes[-10:] if len(daily_closes) >= 10 else daily_closes
-    dates = sorted(df['Date'].unique())
-    last_10_dates = [str(d) for d in dates[-len(last_10_days):]]
+    last_10_dates = [str(d) for d in sorted_dates[-len(last_10_days):]]
     
-    intraday_data = get_intraday_data(df, stock_name, latest_date)
+    intraday_data = get_intraday_data(latest_data, stock_name)
     
-    recent_highs = []
-    recent_lows = []
-    for date in dates[-10:]:
-        date_data = df[df['Date'] == date][stock_name].dropna()
-        if len(date_data) > 0:
-            recent_highs.append(float(date_data.max()))
-            recent_lows.append(float(date_data.min()))
+    recent = has_price[-10:]
+    recent_highs = highs[-10:][recent].astype('float64').round(2).tolist()
+    recent_lows = lows[-10:][recent].astype('float64').round(2).tolist()
     
     resistance = round(max(recent_highs), 2) if recent_highs else stock_info['high']
     support = round(min(recent_lows), 2) if recent_lows else stock_info['low']
@@ -137,7 +195,7 @@ def generate_stock_detail_file(df, stock_name, stock_info, latest_date):
         'change': stock_info['change'],
         'change_pct': stock_info['change_pct'],
         'date': latest_date,
-        'updated_time': datetime.now().strftime('%I:%M %p'),
+        'updated_time': updated_time,
         'ema': {
             'ema_9': ema_9,
             'ema_20': ema_20,
@@ -170,12 +228,27 @@ def generate_stock_detail_file(df, stock_name, stock_info, latest_date):
     return detail_data
 
 
+@lru_cache(maxsize=4)
+def read_config(path, mtime):
+    """Read the config file (cached until its mtime changes)"""
+    with open(path, 'rb') as f:
+        config = orjson.loads(f.read())
+    
+    # Sheet columns are symbols without .NS, build the lookup set once
+    config['_symbol_set'] = frozenset(s['symbol'].replace('.NS', '') for s in config['stocks'])
+    return config
+
+
+def get_available_stocks(df, config):
+    """Configured stocks that have a column in the DataFrame"""
+    return [col for col in df.columns if col in config['_symbol_set']]
+
+
 def load_config():
     """Load stock configuration"""
     print("📋 Loading stock configuration...")
     try:
-        with open(CONFIG_FILE, 'r') as f:
-            config = json.load(f)
+        config = read_config(CONFIG_FILE, os.path.getmtime(CONFIG_FILE))
         print(f"✓ Loaded {len(config['stocks'])} stocks from config")
         return config
     except Exception as e:
@@ -183,6 +256,14 @@ def load_config():
         return None
 
 
+def write_json(path, data):
+    """Write JSON to a temp file, then swap it in so readers never see a partial file"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb', buffering=1 << 16) as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    os.replace(tmp_path, path)
+
+
 def clear_old_data():
     """Clear old data files before generating new analysis"""
     print("🗑️  Clearing old data...")
@@ -200,16 +281,66 @@ def clear_old_data():
     print()
 
 
+def cache_file_for(path):
+    """Parquet cache that sits next to an Excel file (Stock_Tracker_Fixed.parquet)"""
+    return os.path.splitext(path)[0] + '.parquet'
+
+
+def is_cache_fresh(cache_file, mtime):
+    """Check if the Parquet cache is newer than the Excel file's mtime and from this loader version"""
+    if not os.path.exists(cache_file) or os.path.getmtime(cache_file) < mtime:
+        return False
+    try:
+        metadata = pq.read_schema(cache_file).metadata or {}
+    except Exception:
+        return False
+    return metadata.get(b'cache_version') == CACHE_VERSION
+
+
+def save_cache(df, cache_file):
+    """Save parsed Excel data as Parquet for the next run"""
+    try:
+        table = pa.Table.from_pandas(df)
+        table = table.replace_schema_metadata({**table.schema.metadata, b'cache_version': CACHE_VERSION})
+        pq.write_table(table, cache_file, compression='zstd')
+    except Exception as e:
+        print(f"⚠️  Could not write {cache_file}: {e}")
+
+
+@lru_cache(maxsize=4)
+def read_stock_data(path, mtime):
+    """Read and clean the Excel data (cached until its mtime changes)"""
+    cache_file = cache_file_for(path)
+    if is_cache_fresh(cache_file, mtime):
+        print(f"✓ Using cached {cache_file}")
+        return pd.read_parquet(cache_file)
+    
+    # Day and Sector are never used by the analysis, so don't build columns for them
+    df = pd.read_excel(path, engine='calamine', usecols=lambda col: col not in ('Day', 'Sector'))
+    
+    # Remove rows where all stock columns are NaN
+    stock_symbols = [col for col in df.columns if col not in ['Date', 'Time']]
+    df = df.dropna(subset=stock_symbols, how='all')
+    
+    # Prices only carry 2 decimals, float32 halves the memory per column
+    # (higher-priced stocks would come back a paisa off, so they keep float64)
+    if df[stock_symbols].max().max() < FLOAT32_PRICE_LIMIT:
+        df[stock_symbols] = df[stock_symbols].astype('float32')
+    
+    # Time is shown as text everywhere, convert it once here (Excel may give time objects)
+    df['Time'] = df['Time'].astype(str)
+    
+    # Repeated dates as (ordered) categories compare on integer codes
+    df['Date'] = df['Date'].astype(pd.CategoricalDtype(ordered=True))
+    save_cache(df, cache_file)
+    return df
+
+
 def load_stock_data():
-    """Load Excel data"""
+    """Load Excel data (from the Parquet cache when it is up to date)"""
     print(f"\n📂 Loading Excel data from {EXCEL_FILE}...")
     try:
-        df = pd.read_excel(EXCEL_FILE)
-        
-        # Remove rows where all stock columns are NaN
-        stock_symbols = [col for col in df.columns if col not in ['Date', 'Time', 'Day', 'Sector']]
-        df = df.dropna(subset=stock_symbols, how='all')
-        
+        df = read_stock_data(EXCEL_FILE, os.path.getmtime(EXCEL_FILE))
         print(f"✓ Loaded {len(df)} rows")
         print(f"✓ Date range: {df['Date'].min()} to {df['Date'].max()}")
         return df
@@ -218,81 +349,88 @@ def load_stock_data():
         return None
 
 
-def analyze_stock(stock_name, stock_data_with_time):
-    """Analyze individual stock"""
-    if len(stock_data_with_time) < 2:
-        return None
-    
-    open_price = stock_data_with_time[stock_name].iloc[0]
-    close_price = stock_data_with_time[stock_name].iloc[-1]
-    
-    high_idx = stock_data_with_time[stock_name].idxmax()
-    high_price = stock_data_with_time.loc[high_idx, stock_name]
-    high_time = str(stock_data_with_time.loc[high_idx, 'Time'])
-    
-    low_idx = stock_data_with_time[stock_name].idxmin()
-    low_price = stock_data_with_time.loc[low_idx, stock_name]
-    low_time = str(stock_data_with_time.loc[low_idx, 'Time'])
-    
-    change = close_price - open_price
-    change_pct = (change / open_price) * 100
-    
-    return {
-        'name': stock_name,
-        'open': round(float(open_price), 2),
-        'close': round(float(close_price), 2),
-        'high': round(float(high_price), 2),
-        'high_time': high_time,
-        'low': round(float(low_price), 2),
-        'low_time': low_time,
-        'change': round(float(change), 2),
-        'change_pct': round(float(change_pct), 2),
-        'green_shadow': round(float(high_price - close_price), 2),
-        'red_shadow': round(float(open_price - low_price), 2)
-    }
+def group_by_date(df):
+    """Split the data into per-date frames once (dates in sorted order)"""
+    date_groups = {date: group for date, group in df.groupby('Date', sort=True, observed=True)}
+    return date_groups, list(date_groups)
+
+
+def analyze_stocks(names, opens, closes, highs, high_times, lows, low_times):
+    """Build summaries for all stocks from their per-stock price arrays"""
+    changes = closes - opens
+    
+    # Round every metric in one NumPy call instead of round(float(...)) per field
+    metrics = np.round(np.vstack([
+        opens, closes, highs, lows, changes, changes / opens * 100, highs - closes, opens - lows
+    ]), 2)
+    
+    return [
+        {
+            'name': name,
+            'open': open_price,
+            'close': close_price,
+            'high': high_price,
+            'high_time': high_time,
+            'low': low_price,
+            'low_time': low_time,
+            'change': change,
+            'change_pct': change_pct,
+            'green_shadow': green_shadow,
+            'red_shadow': red_shadow
+        }
+        for name, high_time, low_time, (open_price, close_price, high_price, low_price,
+                                         change, change_pct, green_shadow, red_shadow)
+        in zip(names, high_times, low_times, metrics.T.tolist())
+    ]
+
 
+def split_gainers_losers(stocks, key):
+    """Gainers (best first) and losers (worst first) from a single sort"""
+    # NaN (e.g. a zero open) is neither a gain nor a loss, and would break the sort order
+    stocks = [stock for stock in stocks if stock[key] == stock[key]]
+    
+    # Ascending sort; gainer ties are ordered backwards so both lists keep sheet order after the reverse
+    ranked = [stock for _, stock in sorted(
+        enumerate(stocks),
+        key=lambda item: (item[1][key], -item[0] if item[1][key] > 0 else item[0])
+    )]
+    values = [stock[key] for stock in ranked]
+    
+    losers = ranked[:bisect_left(values, 0)]
+    gainers = ranked[bisect_right(values, 0):][::-1]
+    return gainers, losers
 
-def analyze_latest_day(df, config):
+
+def analyze_latest_day(df, config, date_groups):
     """Analyze latest day"""
     print("\n📊 Analyzing latest trading day...")
     
-    stock_symbols = [s['symbol'].replace('.NS', '') for s in config['stocks']]
-    available_stocks = [col for col in df.columns if col in stock_symbols]
-    
-    dates = sorted(df['Date'].unique(), reverse=True)
-    latest_date = None
+    available_stocks = get_available_stocks(df, config)
     
-    for date in dates:
-        date_data = df[df['Date'] == date]
-        for stock in available_stocks:
-            if date_data[stock].dropna().shape[0] > 0:
-                latest_date = date
-                break
-        if latest_date:
-            break
-    
-    if not latest_date:
+    # Latest date with a price for any configured stock, in one pass
+    has_data = df[available_stocks].notna().to_numpy().any(axis=1)
+    if not has_data.any():
         return None
     
+    latest_date = df.loc[has_data, 'Date'].max()
+    
     print(f"   Latest date: {latest_date}")
     
-    latest_data = df[df['Date'] == latest_date]
-    all_stocks = []
-    gainers = []
-    losers = []
+    latest_data = date_groups[latest_date][['Time'] + available_stocks]
+    prices = latest_data[available_stocks]
     
-    for stock in available_stocks:
-        stock_data_with_time = latest_data[['Time', stock]].dropna()
-        result = analyze_stock(stock, stock_data_with_time)
-        if result:
-            all_stocks.append(result)
-            if result['change_pct'] > 0:
-                gainers.append(result)
-            elif result['change_pct'] < 0:
-                losers.append(result)
+    # Need at least 2 prices on the day to analyze a stock
+    prices = prices.loc[:, prices.count() >= 2]
     
-    gainers = sorted(gainers, key=lambda x: x['change_pct'], reverse=True)
-    losers = sorted(losers, key=lambda x: x['change_pct'])
+    # One pass over the whole price panel instead of a loop per stock
+    opens, closes, highs, lows, high_idx, low_idx = reduce_panel(prices.to_numpy())
+    
+    # Back to 2-decimal float64 before doing any math on the (possibly float32) prices
+    opens, closes, highs, lows = (np.round(a.astype('float64'), 2) for a in (opens, closes, highs, lows))
+    times = latest_data['Time'].to_numpy()
+    
+    all_stocks = analyze_stocks(prices.columns, opens, closes, highs, times[high_idx], lows, times[low_idx])
+    gainers, losers = split_gainers_losers(all_stocks, 'change_pct')
     
     print(f"   ✓ {len(gainers)} gainers, {len(losers)} losers")
     
@@ -304,81 +442,69 @@ def analyze_latest_day(df, config):
     }
 
 
-def analyze_date_range(df, config):
+def analyze_date_range(df, config, dates):
     """Analyze entire date range (01-01-2026 to 31-12-2026)"""
     print("\n📊 Analyzing full date range...")
     
-    stock_symbols = [s['symbol'].replace('.NS', '') for s in config['stocks']]
-    available_stocks = [col for col in df.columns if col in stock_symbols]
+    available_stocks = get_available_stocks(df, config)
     
-    dates = sorted(df['Date'].unique())
     print(f"   Date range: {dates[0]} to {dates[-1]}")
     print(f"   Total trading days: {len(dates)}")
     
-    all_stocks_yearly = {}
-    
-    # Initialize stock tracking
-    for stock in available_stocks:
-        all_stocks_yearly[stock] = {
-            'prices': [],
-            'dates': [],
-            'daily_opens': [],
-            'daily_closes': [],
-            'daily_highs': [],
-            'daily_lows': []
-        }
+    # Intraday prices as one (row x stock) array in date order, rows keep their sheet order within a date
+    date_rows = df.groupby('Date', observed=True).indices
+    all_prices = df[available_stocks].to_numpy('float64')[np.concatenate([date_rows[date] for date in dates])].round(2)
     
-    # Process each date
-    for date in dates:
-        date_data = df[df['Date'] == date]
-        
-        for stock in available_stocks:
-            stock_data_with_time = date_data[['Time', stock]].dropna()
-            
-            if len(stock_data_with_time) > 0:
-                prices = stock_data_with_time[stock].values
-                all_stocks_yearly[stock]['prices'].extend(prices)
-                all_stocks_yearly[stock]['dates'].append(str(date))
-                all_stocks_yearly[stock]['daily_opens'].append(float(prices[0]))
-                all_stocks_yearly[stock]['daily_closes'].append(float(prices[-1]))
-                all_stocks_yearly[stock]['daily_highs'].append(float(max(prices)))
-                all_stocks_yearly[stock]['daily_lows'].append(float(min(prices)))
+    # Stocks without a single price are left out
+    counts = (~np.isnan(all_prices)).sum(axis=0)
+    has_prices = counts > 0
+    stocks = [stock for stock, keep in zip(available_stocks, has_prices) if keep]
+    all_prices, counts = all_prices[:, has_prices], counts[has_prices]
+    
+    # Daily OHLC as (date x stock) arrays, NaN on dates a stock has no price
+    daily = {key: frame.to_numpy('float64')[:, has_prices].round(2)
+             for key, frame in build_daily_ohlc(df, available_stocks).items()}
+    traded = ~np.isnan(daily['close'])
+    date_labels = np.array([str(date) for date in dates])
+    
+    # Yearly open/close/high/low and average for every stock in one pass
+    opens, closes, highs, lows, _, _ = reduce_panel(all_prices)
+    averages = np.nansum(all_prices, axis=0) / counts
+    opens, closes, highs, lows, averages = (a.tolist() for a in (opens, closes, highs, lows, averages))
     
     # Calculate yearly statistics
     stock_analysis = []
     
-    for stock in available_stocks:
-        stock_data = all_stocks_yearly[stock]
+    for col, stock in enumerate(stocks):
+        prices = all_prices[:, col]
+        days = traded[:, col]
         
-        if len(stock_data['prices']) == 0:
-            continue
-        
-        yearly_open = stock_data['daily_opens'][0]
-        yearly_close = stock_data['daily_closes'][-1]
-        yearly_high = max(stock_data['daily_highs'])
-        yearly_low = min(stock_data['daily_lows'])
+        yearly_open = opens[col]
+        yearly_close = closes[col]
         yearly_change = yearly_close - yearly_open
         yearly_change_pct = (yearly_change / yearly_open) * 100
         
-        avg_price = sum(stock_data['prices']) / len(stock_data['prices'])
-        
         stock_analysis.append({
             'name': stock,
             'yearly_open': round(yearly_open, 2),
             'yearly_close': round(yearly_close, 2),
-            'yearly_high': round(yearly_high, 2),
-            'yearly_low': round(yearly_low, 2),
+            'yearly_high': round(highs[col], 2),
+            'yearly_low': round(lows[col], 2),
             'yearly_change': round(yearly_change, 2),
             'yearly_change_pct': round(yearly_change_pct, 2),
-            'avg_price': round(avg_price, 2),
-            'trading_days': len(stock_data['daily_closes']),
-            'prices_data': stock_data
+            'avg_price': round(averages[col], 2),
+            'trading_days': int(days.sum()),
+            'prices_data': {
+                'prices': prices[~np.isnan(prices)],
+                'dates': date_labels[days].tolist(),
+                'daily_opens': daily['open'][days, col].tolist(),
+                'daily_closes': daily['close'][days, col].tolist(),
+                'daily_highs': daily['high'][days, col].tolist(),
+                'daily_lows': daily['low'][days, col].tolist()
+            }
         })
     
-    gainers = sorted([s for s in stock_analysis if s['yearly_change_pct'] > 0], 
-                     key=lambda x: x['yearly_change_pct'], reverse=True)
-    losers = sorted([s for s in stock_analysis if s['yearly_change_pct'] < 0], 
-                    key=lambda x: x['yearly_change_pct'])
+    gainers, losers = split_gainers_losers(stock_analysis, 'yearly_change_pct')
     
     print(f"   ✓ {len(gainers)} gainers, {len(losers)} losers")
     
@@ -407,8 +533,11 @@ def save_dashboard_data(analysis):
         mood, mood_emoji = "neutral", "😐"
     
     shares = 100
-    total_value = sum(s['close'] * shares for s in analysis['all_stocks'])
-    total_change = sum(s['change'] * shares for s in analysis['all_stocks'])
+    closes = np.array([s['close'] for s in analysis['all_stocks']], dtype='float64')
+    changes = np.array([s['change'] for s in analysis['all_stocks']], dtype='float64')
+    change_pcts = np.array([s['change_pct'] for s in analysis['all_stocks']], dtype='float64')
+    total_value = float(closes.sum()) * shares
+    total_change = float(changes.sum()) * shares
     change_pct = (total_change / (total_value - total_change)) * 100 if total_value > 0 else 0
     
     output = {
@@ -425,7 +554,7 @@ def save_dashboard_data(analysis):
             'total_stocks': len(analysis['all_stocks']),
             'gainers_count': gainers_count,
             'losers_count': losers_count,
-            'avg_volatility': round(sum(abs(s['change_pct']) for s in analysis['all_stocks']) / len(analysis['all_stocks']), 2) if analysis['all_stocks'] else 0
+            'avg_volatility': round(float(np.abs(change_pcts).mean()), 2) if len(change_pcts) else 0
         },
         'top_gainers': analysis['gainers'][:3],
         'top_losers': analysis['losers'][:3],
@@ -433,23 +562,40 @@ def save_dashboard_data(analysis):
         'insights': []
     }
     
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    write_json(OUTPUT_FILE, output)
     
     print("✓ Saved")
+    save_dashboard_history(analysis)
     return output
 
 
+def save_dashboard_history(analysis):
+    """Save the day's stock summary into the Parquet history (one partition per date)"""
+    columns = ['name', 'open', 'close', 'high', 'low', 'high_time', 'low_time', 'change_pct']
+    history = pd.DataFrame(analysis['all_stocks'], columns=columns)
+    history.insert(0, 'date', analysis['date'])
+    
+    try:
+        # Re-running the same day replaces its partition instead of adding to it
+        history.to_parquet(HISTORY_DIR, partition_cols=['date'], index=False,
+                           existing_data_behavior='delete_matching')
+        print(f"✓ Saved history to {HISTORY_DIR}/")
+    except Exception as e:
+        print(f"⚠️  Could not write {HISTORY_DIR}/: {e}")
+
+
 def analyze_sectors(config, formatted_stocks):
     """Analyze performance by sector"""
     sector_data = {}
+    # Name lookup table; built in reverse so a repeated name maps to its first entry
+    stocks_by_name = {s['name']: s for s in reversed(formatted_stocks)}
     
     for stock_config in config['stocks']:
         sector = stock_config.get('sector', 'Unknown')
         stock_name = stock_config['symbol']
         
         # Find the stock in formatted stocks
-        stock = next((s for s in formatted_stocks if s['name'] == stock_name), None)
+        stock = stocks_by_name.get(stock_name)
         if not stock:
             continue
         
@@ -472,16 +618,17 @@ def analyze_sectors(config, formatted_stocks):
         num_stocks = len(data['stocks'])
         data['avg_change'] = round(data['total_change'] / num_stocks, 2) if num_stocks > 0 else 0
         
-        # Find best and worst performers in sector
-        sorted_stocks = sorted(data['stocks'], key=lambda x: x['change_pct'], reverse=True)
+        # Find best and worst performers in sector (on ties the first best and last worst, as a stable sort gives)
+        best = max(data['stocks'], key=lambda x: x['change_pct']) if data['stocks'] else None
+        worst = min(reversed(data['stocks']), key=lambda x: x['change_pct']) if data['stocks'] else None
         data['best_stock'] = {
-            'name': sorted_stocks[0]['name'],
-            'change_pct': sorted_stocks[0]['change_pct']
-        } if sorted_stocks else None
+            'name': best['name'],
+            'change_pct': best['change_pct']
+        } if best else None
         data['worst_stock'] = {
-            'name': sorted_stocks[-1]['name'],
-            'change_pct': sorted_stocks[-1]['change_pct']
-        } if sorted_stocks else None
+            'name': worst['name'],
+            'change_pct': worst['change_pct']
+        } if worst else None
         
         sectors.append({
             'name': sector_name,
@@ -497,13 +644,10 @@ def analyze_sectors(config, formatted_stocks):
     return sectors
 
 
-def analyze_sector_time_series(df, config):
+def analyze_sector_time_series(df, config, all_dates):
     """Analyze sector performance over time (7 days and 1 month)"""
     print("\n📈 Analyzing sector performance over time...")
     
-    # Get all dates
-    all_dates = sorted(df['Date'].unique())
-    
     if len(all_dates) < 7:
         print("⚠️  Not enough data for time series analysis")
         return None
@@ -513,8 +657,7 @@ def analyze_sector_time_series(df, config):
     last_30_dates = all_dates[-30:] if len(all_dates) >= 30 else all_dates
     
     # Get available stock columns (remove .NS suffix to match DataFrame columns)
-    stock_symbols = [s['symbol'].replace('.NS', '') for s in config['stocks']]
-    available_stocks = [col for col in df.columns if col in stock_symbols]
+    available_stocks = get_available_stocks(df, config)
     
     print(f"   Available stocks in DataFrame: {len(available_stocks)}")
     print(f"   Analyzing last {len(last_7_dates)} days for 7-day trend")
@@ -536,31 +679,31 @@ def analyze_sector_time_series(df, config):
     for sector, stocks in sector_stocks.items():
         print(f"      {sector}: {len(stocks)} stocks")
     
+    # Daily % change of every stock on each of the last 7 days, one row per stock
+    grouped = df.loc[df['Date'].isin(last_7_dates)].groupby('Date', sort=True, observed=True)[available_stocks]
+    day_opens = grouped.first().to_numpy('float64').round(2).T
+    day_closes = grouped.last().to_numpy('float64').round(2).T
+    counted = (grouped.count().to_numpy().T >= 2) & (day_opens > 0)
+    
+    day_changes = np.full(day_opens.shape, np.nan)
+    day_changes[counted] = (day_closes[counted] - day_opens[counted]) / day_opens[counted] * 100
+    
+    # Stock rows laid out sector by sector, each sector a contiguous block starting at sector_starts
+    stock_rows = {stock_name: row for row, stock_name in enumerate(available_stocks)}
+    sector_rows = [stock_rows[stock_name] for stocks in sector_stocks.values() for stock_name in stocks]
+    sector_starts = np.cumsum([0] + [len(stocks) for stocks in sector_stocks.values()])[:-1]
+    
+    # Per-sector daily totals and counts in one reduction (rows are added in sector order)
+    if sector_rows:
+        valid = ~np.isnan(day_changes[sector_rows])
+        sector_totals = np.add.reduceat(np.where(valid, day_changes[sector_rows], 0.0), sector_starts, axis=0)
+        sector_counts = np.add.reduceat(valid.astype(int), sector_starts, axis=0)
+    
     # Calculate 7-day performance
     seven_day_performance = {}
-    for sector, stocks in sector_stocks.items():
-        daily_changes = []
-        
-        for i in range(len(last_7_dates)):
-            date = last_7_dates[i]
-            date_data = df[df['Date'] == date]
-            
-            sector_avg_change = 0
-            valid_stocks = 0
-            
-            for stock_name in stocks:
-                if stock_name in date_data.columns:
-                    stock_prices = date_data[stock_name].dropna()
-                    if len(stock_prices) >= 2:
-                        open_price = stock_prices.iloc[0]
-                        close_price = stock_prices.iloc[-1]
-                        if open_price > 0:
-                            change_pct = ((close_price - open_price) / open_price) * 100
-                            sector_avg_change += change_pct
-                            valid_stocks += 1
-            
-            avg_change = round(sector_avg_change / valid_stocks, 2) if valid_stocks > 0 else 0
-            daily_changes.append(avg_change)
+    for i, sector in enumerate(sector_stocks):
+        daily_changes = [round(total / count, 2) if count > 0 else 0
+                         for total, count in zip(sector_totals[i], sector_counts[i])]
         
         seven_day_performance[sector] = {
             'dates': [d.strftime('%d-%m-%Y') if isinstance(d, pd.Timestamp) else str(d) for d in last_7_dates],
@@ -574,31 +717,37 @@ def analyze_sector_time_series(df, config):
     # Calculate 1-month performance with best/worst stocks
     print(f"\n   Calculating 1-month performance...")
     one_month_performance = {}
+    
+    # Get data for the month period once, then the first and last available price of every stock
+    month_prices = df.loc[df['Date'].isin(last_30_dates), available_stocks].to_numpy('float64').round(2)
+    month_valid = ~np.isnan(month_prices)
+    month_counts = month_valid.sum(axis=0)
+    first_idx = month_valid.argmax(axis=0)
+    last_idx = len(month_prices) - 1 - month_valid[::-1].argmax(axis=0)
+    month_first_last = {
+        stock_name: (month_prices[first_idx[col], col], month_prices[last_idx[col], col])
+        for col, stock_name in enumerate(available_stocks)
+        if month_counts[col] >= 2
+    }
+    
     for sector, stocks in sector_stocks.items():
         sector_stock_performance = []
         
         for stock_name in stocks:
-            if stock_name in df.columns:
-                # Get data for the month period
-                month_df = df[df['Date'].isin(last_30_dates)]
-                stock_data = month_df[stock_name].dropna()
+            if stock_name in month_first_last:
+                first_price, last_price = month_first_last[stock_name]
                 
-                if len(stock_data) >= 2:
-                    # Get first and last available price
-                    first_price = stock_data.iloc[0]
-                    last_price = stock_data.iloc[-1]
+                if first_price > 0:
+                    change = last_price - first_price
+                    change_pct = (change / first_price) * 100
                     
-                    if first_price > 0:
-                        change = last_price - first_price
-                        change_pct = (change / first_price) * 100
-                        
-                        sector_stock_performance.append({
-                            'name': stock_name,
-                            'change': round(change, 2),
-                            'change_pct': round(change_pct, 2),
-                            'first_price': round(first_price, 2),
-                            'last_price': round(last_price, 2)
-                        })
+                    sector_stock_performance.append({
+                        'name': stock_name,
+                        'change': round(change, 2),
+                        'change_pct': round(change_pct, 2),
+                        'first_price': round(first_price, 2),
+                        'last_price': round(last_price, 2)
+                    })
         
         # Sort to find best and worst
         if sector_stock_performance:
@@ -635,11 +784,15 @@ def save_yearly_dashboard_data(analysis, config):
     else:
         mood, mood_emoji = "neutral", "➡️"
     
-    total_change_pct = sum(s['yearly_change_pct'] for s in analysis['all_stocks']) / len(analysis['all_stocks']) if analysis['all_stocks'] else 0
+    change_pcts = np.array([s['yearly_change_pct'] for s in analysis['all_stocks']], dtype='float64')
+    total_change_pct = float(change_pcts.mean()) if len(change_pcts) else 0
     
     # Calculate portfolio totals
-    total_value = sum(s['yearly_close'] * 100 for s in analysis['all_stocks'])
-    total_open_value = sum(s['yearly_open'] * 100 for s in analysis['all_stocks'])
+    shares = 100
+    closes = np.array([s['yearly_close'] for s in analysis['all_stocks']], dtype='float64')
+    opens = np.array([s['yearly_open'] for s in analysis['all_stocks']], dtype='float64')
+    total_value = float(closes.sum()) * shares
+    total_open_value = float(opens.sum()) * shares
     total_change = total_value - total_open_value
     portfolio_change_pct = (total_change / total_open_value * 100) if total_open_value > 0 else 0
     
@@ -660,11 +813,11 @@ def save_yearly_dashboard_data(analysis, config):
             'red_shadow': round(stock['yearly_open'] - stock['yearly_low'], 2)
         })
     
-    # Sort for top gainers/losers
-    gainers = sorted([s for s in formatted_stocks if s['change_pct'] > 0], 
-                     key=lambda x: x['change_pct'], reverse=True)
-    losers = sorted([s for s in formatted_stocks if s['change_pct'] < 0], 
-                    key=lambda x: x['change_pct'])
+    # Top 5 gainers/losers (bounded heap, no full sort)
+    gainers = heapq.nlargest(5, (s for s in formatted_stocks if s['change_pct'] > 0),
+                             key=lambda x: x['change_pct'])
+    losers = heapq.nsmallest(5, (s for s in formatted_stocks if s['change_pct'] < 0),
+                             key=lambda x: x['change_pct'])
     
     # Analyze sectors
     sectors = analyze_sectors(config, formatted_stocks)
@@ -697,11 +850,11 @@ def save_yearly_dashboard_data(analysis, config):
             'total_stocks': len(formatted_stocks),
             'gainers_count': gainers_count,
             'losers_count': losers_count,
-            'avg_volatility': round(sum(abs(s['change_pct']) for s in formatted_stocks) / len(formatted_stocks), 2) if formatted_stocks else 0
+            'avg_volatility': round(float(np.abs(change_pcts).mean()), 2) if len(change_pcts) else 0
         },
         'market_status': 'Positive' if gainers_count > losers_count else 'Negative' if losers_count > gainers_count else 'Neutral',
-        'top_gainers': gainers[:5],
-        'top_losers': losers[:5],
+        'top_gainers': gainers,
+        'top_losers': losers,
         'all_stocks': formatted_stocks,
         'sectors': sectors,
         'insights': [
@@ -712,29 +865,48 @@ def save_yearly_dashboard_data(analysis, config):
         ]
     }
     
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    write_json(OUTPUT_FILE, output)
     
     print("✓ Saved")
     return output
 
 
-def save_individual_stock_details(df, analysis):
+def write_details_parallel(build_fn, stocks):
+    """Build and write stock_details/<name>.json for every stock, several at a time"""
+    if not os.path.exists(STOCK_DETAILS_DIR):
+        os.makedirs(STOCK_DETAILS_DIR)
+    
+    def write_stock_detail(stock_info):
+        write_json(f"{STOCK_DETAILS_DIR}/{stock_info['name']}.json", build_fn(stock_info))
+        return stock_info['name']
+    
+    # Stocks are independent, so build and write them in parallel (results come back in order)
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+        for stock_name in executor.map(write_stock_detail, stocks):
+            print(f"   ✓ {stock_name}.json")
+
+
+def save_individual_stock_details(date_groups, sorted_dates, daily_ohlc, analysis):
     """Save detailed data for each stock"""
     print(f"\n📊 Generating stock details...")
     
-    if not os.path.exists(STOCK_DETAILS_DIR):
-        os.makedirs(STOCK_DETAILS_DIR)
+    all_emas = calculate_emas_for_all(daily_ohlc['close'])
+    
+    # Only the latest day's Time and stock columns are needed for the intraday charts
+    latest_data = date_groups[analysis['date']][['Time'] + list(daily_ohlc['close'].columns)]
+    updated_time = datetime.now().strftime('%I:%M %p')
     
-    for stock_info in analysis['all_stocks']:
+    # Plain (date x stock) arrays, each stock then just takes its column
+    stock_cols = {stock_name: col for col, stock_name in enumerate(daily_ohlc['close'].columns)}
+    closes, highs, lows = (daily_ohlc[key].to_numpy() for key in ('close', 'high', 'low'))
+    
+    def build_stock_detail(stock_info):
         stock_name = stock_info['name']
-        detail_data = generate_stock_detail_file(df, stock_name, stock_info, analysis['date'])
-        
-        filename = f"{STOCK_DETAILS_DIR}/{stock_name}.json"
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(detail_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"   ✓ {stock_name}.json")
+        col = stock_cols[stock_name]
+        return generate_stock_detail_file(latest_data, sorted_dates, closes[:, col], highs[:, col], lows[:, col],
+                                          all_emas[stock_name], stock_name, stock_info, analysis['date'], updated_time)
+    
+    write_details_parallel(build_stock_detail, analysis['all_stocks'])
     
     print(f"✓ Saved to {STOCK_DETAILS_DIR}/")
 
@@ -743,17 +915,15 @@ def save_yearly_stock_details(analysis):
     """Save detailed yearly data for each stock"""
     print(f"\n📊 Generating yearly stock details...")
     
-    if not os.path.exists(STOCK_DETAILS_DIR):
-        os.makedirs(STOCK_DETAILS_DIR)
+    # One timestamp for the whole batch instead of a strftime per stock
+    updated_time = datetime.now().strftime('%I:%M %p')
     
-    for stock_info in analysis['all_stocks']:
+    def build_stock_detail(stock_info):
         stock_name = stock_info['name']
         prices_data = stock_info['prices_data']
         
         # Calculate EMAs on full year data
-        ema_9 = calculate_ema(prices_data['prices'], 9) if len(prices_data['prices']) >= 9 else None
-        ema_20 = calculate_ema(prices_data['prices'], 20) if len(prices_data['prices']) >= 20 else None
-        ema_200 = calculate_ema(prices_data['prices'], 200) if len(prices_data['prices']) >= 200 else None
+        ema_9, ema_20, ema_200 = calculate_emas(prices_data['prices'])
         
         # Analyze trends
         trend = analyze_trend(stock_info['yearly_close'], ema_9, ema_20, ema_200)
@@ -778,7 +948,7 @@ def save_yearly_stock_details(analysis):
             'change': stock_info['yearly_change'],
             'change_pct': stock_info['yearly_change_pct'],
             'date': str(analysis['date_range']),
-            'updated_time': datetime.now().strftime('%I:%M %p'),
+            'updated_time': updated_time,
             'ema': {
                 'ema_9': ema_9,
                 'ema_20': ema_20,
@@ -811,30 +981,47 @@ def save_yearly_stock_details(analysis):
             }
         }
         
-        filename = f"{STOCK_DETAILS_DIR}/{stock_name}.json"
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(detail_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"   ✓ {stock_name}.json")
+        return detail_data
+    
+    write_details_parallel(build_stock_detail, analysis['all_stocks'])
     
     print(f"✓ Saved {len(analysis['all_stocks'])} stock details to {STOCK_DETAILS_DIR}/")
 
 
-def save_sector_details(df, config):
+def save_sector_details(df, config, sorted_dates):
     """Save detailed sector analysis data"""
     print(f"\n📊 Generating sector details data...")
     
-    sector_time_data = analyze_sector_time_series(df, config)
+    sector_time_data = analyze_sector_time_series(df, config, sorted_dates)
     
     if sector_time_data:
         output_file = 'sector_details_data.json'
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(sector_time_data, f, indent=2, ensure_ascii=False)
+        write_json(output_file, sector_time_data)
         print(f"✓ Saved sector details to {output_file}")
     else:
         print("⚠️  Could not generate sector details")
 
 
+def print_summary(analysis):
+    """Print the final summary in a single write"""
+    lines = [
+        "",
+        "=" * 70,
+        "✓ YEARLY ANALYSIS COMPLETE!",
+        "=" * 70,
+        f"✓ Dashboard: {OUTPUT_FILE}",
+        f"✓ Details: {STOCK_DETAILS_DIR}/",
+        "",
+        "📊 Analysis Summary:",
+        f"   Total Stocks: {len(analysis['all_stocks'])}",
+        f"   Trading Days: {analysis['total_trading_days']}",
+        f"   Gainers: {len(analysis['gainers'])}",
+        f"   Losers: {len(analysis['losers'])}",
+        f"   Date Range: {analysis['date_range']}"
+    ]
+    sys.stdout.write('\n'.join(lines) + '\n')
+
+
 def main():
     """Main execution"""
     print("=" * 70)
@@ -856,8 +1043,11 @@ def main():
         print("❌ No data in Excel file!")
         return
     
+    # Sort the dates once for every step below
+    sorted_dates = sorted(df['Date'].unique())
+    
     # STEP 4: Analyze data
-    analysis = analyze_date_range(df, config)
+    analysis = analyze_date_range(df, config, sorted_dates)
     if not analysis:
         print("❌ Analysis failed!")
         return
@@ -865,21 +1055,46 @@ def main():
     # STEP 5: Save new data
     save_yearly_dashboard_data(analysis, config)
     save_yearly_stock_details(analysis)
-    save_sector_details(df, config)
+    save_sector_details(df, config, sorted_dates)
     
-    print("\n" + "=" * 70)
-    print("✓ YEARLY ANALYSIS COMPLETE!")
+    print_summary(analysis)
+
+
+def daily_main():
+    """Latest trading day execution"""
+    print("=" * 70)
+    print("🚀 ENHANCED STOCK ANALYSIS - LATEST TRADING DAY")
     print("=" * 70)
-    print(f"✓ Dashboard: {OUTPUT_FILE}")
-    print(f"✓ Details: {STOCK_DETAILS_DIR}/")
     print()
-    print("📊 Analysis Summary:")
-    print(f"   Total Stocks: {len(analysis['all_stocks'])}")
-    print(f"   Trading Days: {analysis['total_trading_days']}")
-    print(f"   Gainers: {len(analysis['gainers'])}")
-    print(f"   Losers: {len(analysis['losers'])}")
-    print(f"   Date Range: {analysis['date_range']}")
+
+    clear_old_data()
+
+    config = load_config()
+    if not config:
+        return
+
+    df = load_stock_data()
+    if df is None:
+        print("❌ No data in Excel file!")
+        return
+
+    # Split the data by date once for the analysis and every stock's detail file
+    date_groups, sorted_dates = group_by_date(df)
+
+    analysis = analyze_latest_day(df, config, date_groups)
+    if not analysis:
+        print("❌ Analysis failed!")
+        return
+
+    daily_ohlc = build_daily_ohlc(df, [s['name'] for s in analysis['all_stocks']])
+    save_dashboard_data(analysis)
+    save_individual_stock_details(date_groups, sorted_dates, daily_ohlc, analysis)
+
+    print(f"\n✓ DAILY ANALYSIS COMPLETE for {analysis['date']}")
 
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == '--today':
+        daily_main()
+    else:
+        main()
@@ -7,32 +7,38 @@ MODULAR Stock Data Fetcher - SECTOR COLUMN FIXED!
 """
 import yfinance as yf
 import openpyxl
-from openpyxl.styles import PatternFill, Alignment
-from datetime import datetime, timedelta, time as dt_time
+from openpyxl.styles import PatternFill
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.formatting.formatting import ConditionalFormattingList
+from openpyxl.utils import get_column_letter
+from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
 import time
-import json
+import orjson
+from setup_excel_fixed import TIME_SLOTS, TIME_LABELS, BASIC_FONT, BASIC_ALIGNMENT, STOCK_ALIGNMENT, styled_cell, start_sheet
+import sqlite3
 import os
 
 # ============ CONFIGURATION FILE ============
 STOCKS_CONFIG_FILE = 'stocks_config.json'
 EXCEL_FILE = 'Stock_Tracker_Fixed.xlsx'
+PRICE_CACHE_FILE = 'price_cache.sqlite'  # Slot prices of finished days, keyed by (symbol, date)
+BATCH_SIZE = 20  # Symbols per yf.download call
+RANGE_DAYS = 7  # Yahoo serves at most 7 days of 1-minute bars per request
 
 # ============ TIME SLOTS ============
-TIME_SLOTS = [
-    dt_time(9, 0), dt_time(9, 15), dt_time(9, 30), dt_time(9, 45),
-    dt_time(10, 0), dt_time(10, 15), dt_time(10, 30), dt_time(10, 45),
-    dt_time(11, 0), dt_time(11, 15), dt_time(11, 30), dt_time(11, 45),
-    dt_time(12, 0), dt_time(12, 15), dt_time(12, 30), dt_time(12, 45),
-    dt_time(13, 0), dt_time(13, 15), dt_time(13, 30), dt_time(13, 45),
-    dt_time(14, 0), dt_time(14, 15), dt_time(14, 30), dt_time(14, 45),
-    dt_time(15, 0), dt_time(15, 15), dt_time(15, 30)
-]
+# Each slot takes the last price within ±7.5 minutes of it (seconds of the day)
+SLOT_SECONDS = np.array([slot.hour * 3600 + slot.minute * 60 for slot in TIME_SLOTS])
+SLOT_HALF_WIDTH = 7 * 60 + 30
+SLOT_INDEX = {slot: i for i, slot in enumerate(TIME_SLOTS)}
+SLOT_LABELS = dict(zip(TIME_SLOTS, TIME_LABELS))
 
 # ============ COLORS ============
 GREEN_FILL = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
 RED_FILL = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
-NEUTRAL_FILL = PatternFill(start_color='FFFFFF', end_color='FFFFFF', fill_type='solid')
+PRICE_FORMAT = '₹#,##0.00'
 
 
 def load_stocks_config():
@@ -42,8 +48,8 @@ def load_stocks_config():
         return {}
     
     try:
-        with open(STOCKS_CONFIG_FILE, 'r') as f:
-            config = json.load(f)
+        with open(STOCKS_CONFIG_FILE, 'rb') as f:
+            config = orjson.loads(f.read())
         
         stocks = {item['symbol']: item['sector'] for item in config['stocks']}
         print(f"✓ Loaded {len(stocks)} stocks from {STOCKS_CONFIG_FILE}")
@@ -54,45 +60,191 @@ def load_stocks_config():
         return {}
 
 
-def get_intraday_prices(symbol, target_date):
-    """Fetch intraday prices for one stock on one date"""
-    try:
-        ticker = yf.Ticker(symbol)
-        start = target_date
-        end = target_date + timedelta(days=1)
-        data = ticker.history(start=start, end=end, interval='1m')
-        
-        if data.empty:
-            return {}
-        
-        try:
-            data.index = data.index.tz_convert('Asia/Kolkata')
-        except:
-            pass
+def open_price_cache():
+    """Open the on-disk price cache, creating its table on first use"""
+    conn = sqlite3.connect(PRICE_CACHE_FILE)
+    conn.execute("CREATE TABLE IF NOT EXISTS prices ("
+                 "symbol TEXT, date TEXT, prices TEXT, PRIMARY KEY (symbol, date))")
+    return conn
+
+
+def load_cached_prices(conn, symbols, trading_days):
+    """Return {date: {symbol: prices}} for every cached (symbol, date) in range"""
+    slots = dict(zip(TIME_LABELS, TIME_SLOTS))
+    days = {date.isoformat(): date for date in trading_days}
+    wanted = set(symbols)
+    
+    cached = {}
+    rows = conn.execute("SELECT symbol, date, prices FROM prices WHERE date BETWEEN ? AND ?",
+                        (min(days), max(days)))
+    for symbol, date_str, prices_json in rows:
+        if symbol in wanted and date_str in days:
+            cached.setdefault(days[date_str], {})[symbol] = {
+                slots[slot]: price for slot, price in orjson.loads(prices_json).items()
+            }
+    return cached
+
+
+def save_cached_prices(conn, results):
+    """Store fetched (symbol, date, prices) results of days that are already over"""
+    today = datetime.now().date()
+    rows = [(symbol, date.isoformat(),
+             orjson.dumps({SLOT_LABELS[slot]: price for slot, price in prices.items()},
+                          option=orjson.OPT_SERIALIZE_NUMPY).decode())
+            for symbol, date, prices in results
+            if date < today and prices]  # Today's prices are still moving; empty means the fetch failed
+    conn.executemany("INSERT OR REPLACE INTO prices VALUES (?, ?, ?)", rows)
+    conn.commit()
+
+
+def add_color_rules(sheet, last_col, last_row):
+    """Colour each price green/red against the previous time slot of the same day"""
+    if last_col < 5:
+        return
+    
+    # One pair of rules covers every stock column; references are relative to E2
+    cell_range = f"E2:{get_column_letter(last_col)}{last_row}"
+    same_day = f'$B2<>"{TIME_LABELS[0]}",ISNUMBER(E1),ISNUMBER(E2)'
+    
+    sheet.conditional_formatting = ConditionalFormattingList()
+    sheet.conditional_formatting.add(cell_range, FormulaRule(formula=[f'AND({same_day},E2>E1)'], fill=GREEN_FILL))
+    sheet.conditional_formatting.add(cell_range, FormulaRule(formula=[f'AND({same_day},E2<E1)'], fill=RED_FILL))
+
+
+def read_headers():
+    """Read only the header row of the Excel sheet"""
+    wb = openpyxl.load_workbook(EXCEL_FILE, read_only=True)
+    headers = next(wb.active.iter_rows(max_row=1, values_only=True), ())
+    wb.close()
+    return headers
+
+
+def rewrite_excel(prices, trading_days, col_index, sector, last_col):
+    """
+    Stream the sheet row by row into a fresh write-only workbook,
+    filling in the sector and prices of the fetched days
+    """
+    day_ids = {date.strftime('%d-%m-%Y'): i for i, date in enumerate(trading_days)}
+    seen_dates = set()
+    block_day, block_start = None, None
+    
+    source = openpyxl.load_workbook(EXCEL_FILE, read_only=True)
+    rows = source.active.iter_rows(values_only=True)
+    headers = list(next(rows, ()))
+    while headers and headers[-1] is None:  # The sheet dimension can run past the last header
+        headers.pop()
+    width = len(headers)
+    
+    wb = openpyxl.Workbook(write_only=True)
+    sheet = start_sheet(wb, source.active.title, headers)
+    
+    # One styled cell per column, reused for every row: write-only rows are
+    # serialized on append, so only the values change from row to row
+    basic_cells = [styled_cell(sheet, None, BASIC_FONT, BASIC_ALIGNMENT) for _ in headers[:4]]
+    stock_cells = [styled_cell(sheet, None, alignment=STOCK_ALIGNMENT) for _ in headers[4:]]
+    price_cells = [styled_cell(sheet, None, alignment=STOCK_ALIGNMENT, number_format=PRICE_FORMAT)
+                   for _ in headers[4:]]
+    
+    row = 1
+    for row, values in enumerate(rows, start=2):
+        values = list(values[:width]) + [None] * (width - len(values))
         
-        data = data[data.index.date == target_date]
-        if data.empty:
-            return {}
+        # A fetched date's block is the TIME_SLOTS rows from its first row
+        if values[0] in day_ids and values[0] not in seen_dates:
+            seen_dates.add(values[0])
+            block_day, block_start = day_ids[values[0]], row
         
-        prices = {}
-        for slot in TIME_SLOTS:
-            start_time = (datetime.combine(target_date, slot) - timedelta(minutes=7, seconds=30)).time()
-            end_time = (datetime.combine(target_date, slot) + timedelta(minutes=7, seconds=30)).time()
-            mask = (data.index.time >= start_time) & (data.index.time <= end_time)
-            slot_data = data[mask]
+        if block_day is not None and row - block_start < len(TIME_SLOTS) and sector is not None:
+            # FILL SECTOR COLUMN (column D = 4)
+            values[3] = sector
             
-            if not slot_data.empty:
-                prices[slot] = round(slot_data['Close'].iloc[-1], 2)
+            # Only the stocks that have a price in this slot
+            slot_prices = prices[block_day, row - block_start]
+            for stock_id in np.flatnonzero(~np.isnan(slot_prices) & (slot_prices != 0)).tolist():
+                values[col_index[stock_id]] = slot_prices[stock_id].item()
         
-        return prices
-    except:
+        cells = []
+        for cell, value in zip(basic_cells, values):
+            cell.value = value
+            cells.append(cell)
+        for stock_cell, price_cell, value in zip(stock_cells, price_cells, values[4:]):
+            cell = price_cell if isinstance(value, (int, float)) else stock_cell
+            cell.value = value
+            cells.append(cell)
+        sheet.append(cells)
+    
+    source.close()
+    
+    # COLOR CODING: Excel compares each price with the previous time slot
+    add_color_rules(sheet, last_col, row)
+    
+    # Save next to the original, then swap it in
+    temp_file = EXCEL_FILE + '.tmp'
+    wb.save(temp_file)
+    os.replace(temp_file, EXCEL_FILE)
+
+
+def store_slot_prices(prices, day_id, stock_id, slot_prices):
+    """Copy one stock-day's {slot: price} dict into the (day, slot, stock) array"""
+    for slot, price in slot_prices.items():
+        prices[day_id, SLOT_INDEX[slot], stock_id] = price
+
+
+def get_slot_prices(data, target_date):
+    """Pick the price for each time slot from one stock's 1-minute data"""
+    if data.empty:
+        return {}
+    
+    try:
+        data.index = data.index.tz_convert('Asia/Kolkata')
+    except Exception:
+        pass
+    
+    data = data[data.index.date == target_date]
+    if data.empty:
         return {}
+    
+    # One binary search for all slots: the last bar at or before each window's end,
+    # kept only if it is not before the window's start
+    seconds = (data.index.hour * 3600 + data.index.minute * 60 + data.index.second).to_numpy()
+    closes = data['Close'].to_numpy()
+    last = np.searchsorted(seconds, SLOT_SECONDS + SLOT_HALF_WIDTH, side='right') - 1
+    
+    prices = {}
+    for slot, slot_seconds, i in zip(TIME_SLOTS, SLOT_SECONDS, last):
+        if i >= 0 and seconds[i] >= slot_seconds - SLOT_HALF_WIDTH:
+            prices[slot] = round(closes[i], 2)
+    
+    return prices
+
+
+def get_intraday_prices(symbols, dates):
+    """Fetch intraday prices for a batch of stocks over a run of dates (one yf.download call)"""
+    try:
+        # 1-minute bars carry no split/dividend adjustment, so skip that post-processing
+        data = yf.download(symbols, start=dates[0], end=dates[-1] + timedelta(days=1),
+                           interval='1m', group_by='ticker', auto_adjust=False,
+                           actions=False, prepost=False, threads=True, progress=False)
+    except Exception:
+        return {symbol: {date: {} for date in dates} for symbol in symbols}
+    
+    prices = {}
+    for symbol in symbols:
+        try:
+            # Columns are (symbol, field) pairs when the result is grouped by ticker
+            symbol_data = data[symbol] if data.columns.nlevels > 1 else data
+            symbol_data = symbol_data.dropna(subset=['Close'])
+            prices[symbol] = {date: get_slot_prices(symbol_data, date) for date in dates}
+        except Exception:
+            prices[symbol] = {date: {} for date in dates}
+    
+    return prices
 
 
-def fetch_stock_day(symbol, date):
-    """Fetch one stock for one day"""
-    prices = get_intraday_prices(symbol, date)
-    return (symbol, date, prices)
+def fetch_batch_range(symbols, dates):
+    """Fetch a batch of stocks for a run of days"""
+    prices = get_intraday_prices(symbols, dates)
+    return [(symbol, date, prices[symbol][date]) for date in dates for symbol in symbols]
 
 
 def populate_fixed(start_date_str='01-01-2026', end_date_str=None, max_workers=5):
@@ -118,13 +270,8 @@ def populate_fixed(start_date_str='01-01-2026', end_date_str=None, max_workers=5
     else:
         end_date = datetime.now().date()
     
-    # Get trading days
-    trading_days = []
-    current = start_date
-    while current <= end_date:
-        if current.weekday() < 5:
-            trading_days.append(current)
-        current += timedelta(days=1)
+    # Get trading days (weekdays)
+    trading_days = list(pd.bdate_range(start_date, end_date).date)
     
     print(f"Date Range: {start_date} to {end_date}")
     print(f"Trading Days: {len(trading_days)}")
@@ -139,20 +286,21 @@ def populate_fixed(start_date_str='01-01-2026', end_date_str=None, max_workers=5
         print("Please run setup_excel_fixed.py first!")
         return
     
-    wb = openpyxl.load_workbook(EXCEL_FILE)
-    sheet = wb.active
+    headers = read_headers()
     
     # Get stock column mapping (now starting from column 5 = E)
+    short_to_symbol = {}
+    for symbol in STOCKS.keys():
+        short_to_symbol.setdefault(symbol.replace('.NS', '').replace('.BO', ''), symbol)
+    
     stock_columns = {}
-    for col in range(5, 200):  # Starting from column E (5)
-        stock_name = sheet.cell(row=1, column=col).value
+    for col, stock_name in enumerate(headers[4:], start=5):  # Starting from column E (5)
         if not stock_name:
             break
         # Find full symbol
-        for symbol in STOCKS.keys():
-            if symbol.replace('.NS', '').replace('.BO', '') == stock_name:
-                stock_columns[symbol] = col
-                break
+        symbol = short_to_symbol.get(stock_name)
+        if symbol:
+            stock_columns[symbol] = col
     
     print(f"Found {len(stock_columns)} stock columns in Excel")
     print()
@@ -169,38 +317,65 @@ def populate_fixed(start_date_str='01-01-2026', end_date_str=None, max_workers=5
     print("⚡ Starting parallel fetch...")
     print()
     
-    # Create tasks
-    tasks = []
+    # Reuse prices of days fetched on an earlier run
+    symbols = list(stock_columns.keys())
+    cache = open_price_cache()
+    cached = load_cached_prices(cache, symbols, trading_days) if trading_days else {}
+    cached_count = sum(len(day_prices) for day_prices in cached.values())
+    print(f"Cached: {cached_count} stock-days (skipping fetch)")
+    print()
+    
+    # Split the trading days into runs that fit in one request
+    date_ranges = []
     for date in trading_days:
-        for symbol in stock_columns.keys():
-            tasks.append((symbol, date))
+        if date_ranges and (date - date_ranges[-1][0]).days < RANGE_DAYS:
+            date_ranges[-1].append(date)
+        else:
+            date_ranges.append([date])
+    
+    # Create tasks (one per batch of symbols with an uncached day in the run)
+    tasks = []
+    for dates in date_ranges:
+        missing = [symbol for symbol in symbols
+                   if any(symbol not in cached.get(date, {}) for date in dates)]
+        for i in range(0, len(missing), BATCH_SIZE):
+            tasks.append((missing[i:i + BATCH_SIZE], dates))
+    
+    # All prices in one (day, slot, stock) array; NaN where there is no price
+    day_index = {date: i for i, date in enumerate(trading_days)}
+    symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+    prices = np.full((len(trading_days), len(TIME_SLOTS), len(symbols)), np.nan)
+    for date, day_prices in cached.items():
+        for symbol, slot_prices in day_prices.items():
+            store_slot_prices(prices, day_index[date], symbol_index[symbol], slot_prices)
     
-    # Fetch all data
-    all_data = {}
+    # Fetch the rest
     completed = 0
-    total = len(tasks)
+    total = sum(len(batch) * len(dates) for batch, dates in tasks)
     start_time = time.time()
     
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         future_to_task = {
-            executor.submit(fetch_stock_day, symbol, date): (symbol, date)
-            for symbol, date in tasks
+            executor.submit(fetch_batch_range, batch, dates): (batch, dates)
+            for batch, dates in tasks
         }
         
         for future in as_completed(future_to_task):
-            symbol, date, prices = future.result()
+            results = future.result()
+            for symbol, date, slot_prices in results:
+                store_slot_prices(prices, day_index[date], symbol_index[symbol], slot_prices)
+            save_cached_prices(cache, results)
             
-            if date not in all_data:
-                all_data[date] = {}
-            all_data[date][symbol] = prices
-            
-            completed += 1
-            if completed % 10 == 0 or completed == total:
-                elapsed = time.time() - start_time
-                rate = completed / elapsed if elapsed > 0 else 0
-                remaining = (total - completed) / rate if rate > 0 else 0
-                print(f"Progress: {completed}/{total} ({completed/total*100:.1f}%) | "
-                      f"Rate: {rate:.1f}/sec | ETA: {remaining:.0f}s")
+            # Progress after every batch (counted in stock-days)
+            batch, dates = future_to_task[future]
+            completed += len(batch) * len(dates)
+            elapsed = time.time() - start_time
+            rate = completed / elapsed if elapsed > 0 else 0
+            remaining = (total - completed) / rate if rate > 0 else 0
+            print(f"Progress: {completed}/{total} ({completed/total*100:.1f}%) | "
+                  f"Rate: {rate:.1f}/sec | ETA: {remaining:.0f}s")
+    
+    cache.close()
     
     print()
     print("✓ All data fetched!")
@@ -209,68 +384,14 @@ def populate_fixed(start_date_str='01-01-2026', end_date_str=None, max_workers=5
     print("Writing to Excel with colors and sectors...")
     
     write_start = time.time()
+    last_col = max(stock_columns.values(), default=4)
     
-    # Write data with color coding
-    for date in sorted(all_data.keys()):
-        date_str = date.strftime('%d-%m-%Y')
-        
-        # Find starting row for this date
-        start_row = None
-        for row in range(2, 10000):  # Starting from row 2 (headers in row 1)
-            if sheet.cell(row=row, column=1).value == date_str:
-                start_row = row
-                break
-        
-        if not start_row:
-            continue
-        
-        # For each time slot in this date
-        for time_idx, time_slot in enumerate(TIME_SLOTS):
-            current_row = start_row + time_idx
-            
-            # FILL SECTOR COLUMN (column D = 4)
-            # Get sector from the first stock that has data for this row
-            sector_filled = False
-            for symbol in stock_columns.keys():
-                if symbol in all_data[date]:
-                    sector = STOCKS[symbol]
-                    sheet.cell(row=current_row, column=4, value=sector)
-                    sector_filled = True
-                    break
-            
-            # For each stock
-            for symbol, prices in all_data[date].items():
-                if symbol not in stock_columns:
-                    continue
-                
-                stock_col = stock_columns[symbol]
-                price = prices.get(time_slot)
-                
-                if price:
-                    cell = sheet.cell(row=current_row, column=stock_col)
-                    cell.value = price
-                    cell.number_format = '₹#,##0.00'
-                    cell.alignment = Alignment(horizontal='right')
-                    
-                    # COLOR CODING: Compare with previous time slot
-                    if time_idx > 0:
-                        prev_row = current_row - 1
-                        prev_cell = sheet.cell(row=prev_row, column=stock_col)
-                        prev_price = prev_cell.value
-                        
-                        if prev_price is not None and isinstance(prev_price, (int, float)):
-                            if price > prev_price:
-                                cell.fill = GREEN_FILL
-                            elif price < prev_price:
-                                cell.fill = RED_FILL
-                            else:
-                                cell.fill = NEUTRAL_FILL
-                        else:
-                            cell.fill = NEUTRAL_FILL
-                    else:
-                        cell.fill = NEUTRAL_FILL
-    
-    wb.save(EXCEL_FILE)
+    # Every stock has a (possibly empty) entry for every day, so the sector
+    # always comes from the first stock column
+    sector = STOCKS[symbols[0]] if symbols else None
+    col_index = [stock_columns[symbol] - 1 for symbol in symbols]
+    
+    rewrite_excel(prices, trading_days, col_index, sector, last_col)
     
     print(f"✓ Excel updated!")
     print(f"⏱️  Write time: {time.time() - write_start:.1f}s")
@@ -3,9 +3,11 @@ EXCEL SETUP - Creates Excel file based on stocks_config.json
 FIXED: Sector as a column (like Day), not in header!
 """
 import openpyxl
+import pandas as pd
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
 from datetime import datetime, timedelta, time as dt_time
-import json
+import orjson
 import os
 
 STOCKS_CONFIG_FILE = 'stocks_config.json'
@@ -20,6 +22,55 @@ TIME_SLOTS = [
     dt_time(14, 0), dt_time(14, 15), dt_time(14, 30), dt_time(14, 45),
     dt_time(15, 0), dt_time(15, 15), dt_time(15, 30)
 ]
+TIME_LABELS = [slot.strftime('%H:%M') for slot in TIME_SLOTS]  # Column B text, formatted once
+
+
+# ============ SHEET LAYOUT (also used by populate_modular_fixed.py) ============
+HEADER_FILL = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
+HEADER_FONT = Font(bold=True, color='FFFFFF', size=11, name='Arial')
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='center')
+BASIC_FONT = Font(name='Arial', size=10)
+BASIC_ALIGNMENT = Alignment(horizontal='center')
+STOCK_ALIGNMENT = Alignment(horizontal='right')
+THIN_BORDER = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin')
+)
+COLUMN_WIDTHS = {'A': 12, 'B': 8, 'C': 12, 'D': 18}  # Date, Time, Day, Sector
+STOCK_COLUMN_WIDTH = 12
+
+
+def styled_cell(sheet, value, font=None, alignment=None, fill=None, number_format=None):
+    """Bordered write-only cell in the sheet's layout style"""
+    cell = WriteOnlyCell(sheet, value=value)
+    cell.border = THIN_BORDER
+    if font:
+        cell.font = font
+    if alignment:
+        cell.alignment = alignment
+    if fill:
+        cell.fill = fill
+    if number_format:
+        cell.number_format = number_format
+    return cell
+
+
+def start_sheet(wb, title, headers):
+    """Add a write-only sheet with the column widths, frozen pane and header row"""
+    sheet = wb.create_sheet(title)
+    
+    # Column widths and freeze panes have to be set before the first row is written
+    for col in range(1, len(headers) + 1):
+        col_letter = openpyxl.utils.get_column_letter(col)
+        sheet.column_dimensions[col_letter].width = COLUMN_WIDTHS.get(col_letter, STOCK_COLUMN_WIDTH)
+    
+    # Freeze panes (after Sector column)
+    sheet.freeze_panes = 'E2'
+    
+    sheet.append([styled_cell(sheet, header, HEADER_FONT, HEADER_ALIGNMENT, HEADER_FILL) for header in headers])
+    return sheet
 
 
 def load_stocks_config():
@@ -29,8 +80,8 @@ def load_stocks_config():
         print("Please run stock_manager.py to add stocks first.")
         return {}
     
-    with open(STOCKS_CONFIG_FILE, 'r') as f:
-        config = json.load(f)
+    with open(STOCKS_CONFIG_FILE, 'rb') as f:
+        config = orjson.loads(f.read())
     
     stocks = {item['symbol']: item['sector'] for item in config['stocks']}
     return stocks
@@ -57,95 +108,34 @@ def create_excel_structure(start_date_str='01-01-2026', num_days=30):
     print(f"✓ Loaded {len(STOCKS)} stocks")
     print()
     
-    # Create workbook
-    wb = openpyxl.Workbook()
-    sheet = wb.active
-    sheet.title = "Stock Data"
-    
-    # Styles
-    header_fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
-    header_font = Font(bold=True, color='FFFFFF', size=11, name='Arial')
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    # Row 1: Headers
-    sheet['A1'] = 'Date'
-    sheet['B1'] = 'Time'
-    sheet['C1'] = 'Day'
-    sheet['D1'] = 'Sector'  # NEW: Sector column header
-    
-    # Stock name headers (starting from column E)
-    col = 5
-    for symbol in STOCKS.keys():
-        stock_name = symbol.replace('.NS', '').replace('.BO', '')
-        sheet.cell(row=1, column=col, value=stock_name)
-        col += 1
-    
-    # Format header row
-    for col in range(1, 5 + len(STOCKS)):
-        cell = sheet.cell(row=1, column=col)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = border
+    # Row 1: Headers (Sector column, then stock names starting from column E)
+    headers = ['Date', 'Time', 'Day', 'Sector']
+    headers += [symbol.replace('.NS', '').replace('.BO', '') for symbol in STOCKS.keys()]
+    
+    # Create workbook (write-only: rows are streamed to disk, no cell objects kept in memory)
+    wb = openpyxl.Workbook(write_only=True)
+    sheet = start_sheet(wb, "Stock Data", headers)
     
     # Generate date rows
     start_date = datetime.strptime(start_date_str, '%d-%m-%Y').date()
+    end_date = start_date + timedelta(days=num_days - 1)
     row = 2
     
-    for day_offset in range(num_days):
-        current_date = start_date + timedelta(days=day_offset)
-        
-        # Skip weekends
-        if current_date.weekday() >= 5:
-            continue
-        
+    # Weekdays only
+    for current_date in pd.bdate_range(start_date, end_date).date:
         date_str = current_date.strftime('%d-%m-%Y')
         day_name = current_date.strftime('%A')
         
         # For each time slot
-        for time_slot in TIME_SLOTS:
-            time_str = time_slot.strftime('%H:%M')
-            
-            # Fill basic columns
-            sheet.cell(row=row, column=1, value=date_str)
-            sheet.cell(row=row, column=2, value=time_str)
-            sheet.cell(row=row, column=3, value=day_name)
-            sheet.cell(row=row, column=4, value='')  # Sector filled by populate script
-            
-            # Format basic columns
-            for col in [1, 2, 3, 4]:
-                cell = sheet.cell(row=row, column=col)
-                cell.alignment = Alignment(horizontal='center')
-                cell.border = border
-                cell.font = Font(name='Arial', size=10)
-            
-            # Add borders to stock columns
-            for col in range(5, 5 + len(STOCKS)):
-                cell = sheet.cell(row=row, column=col)
-                cell.border = border
-                cell.alignment = Alignment(horizontal='right')
+        for time_str in TIME_LABELS:
+            # Basic columns (Sector filled by populate script), then empty bordered stock cells
+            cells = [styled_cell(sheet, value, BASIC_FONT, BASIC_ALIGNMENT)
+                     for value in (date_str, time_str, day_name, None)]
+            cells += [styled_cell(sheet, None, alignment=STOCK_ALIGNMENT) for _ in STOCKS]
+            sheet.append(cells)
             
             row += 1
     
-    # Column widths
-    sheet.column_dimensions['A'].width = 12  # Date
-    sheet.column_dimensions['B'].width = 8   # Time
-    sheet.column_dimensions['C'].width = 12  # Day
-    sheet.column_dimensions['D'].width = 18  # Sector
-    
-    # Stock columns
-    for col in range(5, 5 + len(STOCKS)):
-        col_letter = openpyxl.utils.get_column_letter(col)
-        sheet.column_dimensions[col_letter].width = 12
-    
-    # Freeze panes (after Sector column)
-    sheet.freeze_panes = 'E2'
-    
     # Save
     wb.save(EXCEL_FILE)
     
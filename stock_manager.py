@@ -4,6 +4,7 @@ They can add/remove stocks WITHOUT touching the main code.
 No programming knowledge needed!
 """
 import json
+import orjson
 import os
 
 STOCKS_CONFIG_FILE = 'stocks_config.json'
@@ -12,8 +13,8 @@ STOCKS_CONFIG_FILE = 'stocks_config.json'
 def load_config():
     """Load current stocks"""
     if os.path.exists(STOCKS_CONFIG_FILE):
-        with open(STOCKS_CONFIG_FILE, 'r') as f:
-            return json.load(f)
+        with open(STOCKS_CONFIG_FILE, 'rb') as f:
+            return orjson.loads(f.read())
     else:
         return {"stocks": []}
 